@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from application.dto import GeoBBox
+from infra.db import DATABASE_URL
+from infra.export import EXPORT_FORMATS
+from infra.repository import OrganizationReadRepository
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Выгрузка каталога организаций")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument(
+        "--output", default="-", help="Файл для записи (по умолчанию stdout)"
+    )
+    parser.add_argument(
+        "--bbox",
+        help="Прямоугольник min_lat,min_lon,max_lat,max_lon",
+    )
+    parser.add_argument("--activity", help="Вид деятельности (с подкатегориями)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    return parser.parse_args()
+
+
+async def export(args: argparse.Namespace) -> None:
+    bbox = None
+    if args.bbox:
+        min_lat, min_lon, max_lat, max_lon = (float(v) for v in args.bbox.split(","))
+        bbox = GeoBBox(min_lat=min_lat, min_lon=min_lon, max_lat=max_lat, max_lon=max_lon)
+
+    _, encode = EXPORT_FORMATS[args.format]
+    engine = create_async_engine(DATABASE_URL)
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+
+    try:
+        async with AsyncSession(engine) as session:
+            repo = OrganizationReadRepository(session)
+            batches = repo.stream_all(
+                bbox=bbox,
+                activity=args.activity,
+                batch_size=args.batch_size,
+            )
+            async for chunk in encode(batches):
+                output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(export(parse_args()))
@@ -1,19 +1,161 @@
+import asyncio
 import os
-from collections.abc import AsyncGenerator
-from typing import Annotated
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import Annotated, Any, Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Security, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    Security,
+    status,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.dto import GeoBBox, OrganizationDetail
+from application.dto import (
+    ORGANIZATION_FIELDS,
+    ChangeFeedPage,
+    ChangeToken,
+    GeoBBox,
+    GeoPolygon,
+    OrganizationDetail,
+)
 from application.protocols import OrganizationReadRepositoryProtocol
 from domain.entities import GeoPoint
-from infra.db import sessionmaker
+from infra.admission import AdmissionController, AdmissionRejected, EndpointClass
+from infra.db import MAX_OVERFLOW, POOL_SIZE, engine, sessionmaker
+from infra.export import EXPORT_FORMATS
 from infra.repository import OrganizationReadRepository
+from infra.responses import (
+    MEDIA_TYPE_COLUMNAR_JSON,
+    MEDIA_TYPE_MSGPACK,
+    CompressionMiddleware,
+    negotiate_media_type,
+    render_organization,
+    render_organizations,
+)
+from infra.warmup import StartupState, run_warmup
+
+WARMUP_CONNECTIONS = min(
+    int(os.getenv("WARMUP_CONNECTIONS", str(POOL_SIZE))),
+    POOL_SIZE,
+)
+if WARMUP_CONNECTIONS < 0:
+    raise ValueError("WARMUP_CONNECTIONS must be >= 0 (0 disables warmup)")
+
+startup_state = StartupState(started_at=time.perf_counter())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Запускает прогрев пула в фоне; /ready отвечает 200 только после него."""
+    warmup_task = asyncio.create_task(
+        run_warmup(startup_state, engine, connections=WARMUP_CONNECTIONS)
+    )
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup_task
+        await engine.dispose()
+
+
+app = FastAPI(title="Organization Directory API", lifespan=lifespan)
+
+EXACT_COUNT_THRESHOLD = int(os.getenv("EXACT_COUNT_THRESHOLD", "10000"))
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", str(POOL_SIZE + MAX_OVERFLOW)))
+# Поиск и выгрузка по умолчанию занимают не больше двух третей ёмкости и
+# всегда оставляют хотя бы один слот для lookup.
+ADMISSION_EXPORT_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_EXPORT_MAX_IN_FLIGHT", "1"))
+ADMISSION_SEARCH_MAX_IN_FLIGHT = int(
+    os.getenv(
+        "ADMISSION_SEARCH_MAX_IN_FLIGHT",
+        str(
+            max(
+                1,
+                min(
+                    ADMISSION_CAPACITY * 2 // 3,
+                    ADMISSION_CAPACITY - ADMISSION_EXPORT_MAX_IN_FLIGHT - 1,
+                ),
+            )
+        ),
+    )
+)
+
+admission = AdmissionController(
+    capacity=ADMISSION_CAPACITY,
+    classes=[
+        EndpointClass(
+            name="lookup",
+            priority=0,
+            max_in_flight=int(os.getenv("ADMISSION_LOOKUP_MAX_IN_FLIGHT", str(ADMISSION_CAPACITY))),
+            max_queue=int(os.getenv("ADMISSION_LOOKUP_MAX_QUEUE", "200")),
+            max_wait=float(os.getenv("ADMISSION_LOOKUP_MAX_WAIT", "2.0")),
+        ),
+        EndpointClass(
+            name="search",
+            priority=1,
+            max_in_flight=ADMISSION_SEARCH_MAX_IN_FLIGHT,
+            max_queue=int(os.getenv("ADMISSION_SEARCH_MAX_QUEUE", "50")),
+            max_wait=float(os.getenv("ADMISSION_SEARCH_MAX_WAIT", "1.0")),
+        ),
+        EndpointClass(
+            name="export",
+            priority=2,
+            max_in_flight=ADMISSION_EXPORT_MAX_IN_FLIGHT,
+            max_queue=int(os.getenv("ADMISSION_EXPORT_MAX_QUEUE", "2")),
+            max_wait=float(os.getenv("ADMISSION_EXPORT_MAX_WAIT", "5.0")),
+        ),
+    ],
+)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(
+    request: Request, exc: AdmissionRejected
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Service overloaded, retry later"},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(admission.render_metrics() + startup_state.render_metrics())
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready() -> JSONResponse:
+    return JSONResponse(
+        status_code=(
+            status.HTTP_200_OK
+            if startup_state.ready
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+        content={
+            "ready": startup_state.ready,
+            "warmed_connections": startup_state.warmed_connections,
+            "warmup_seconds": startup_state.warmup_seconds,
+            "startup_seconds": startup_state.startup_seconds,
+        },
+    )
 
-app = FastAPI(title="Organization Directory API")
 
 API_SECURITY_KEY = os.getenv(
     "API_KEY",
@@ -37,6 +179,24 @@ router = APIRouter(
 )
 
 
+def admit(endpoint_class: str):
+    """
+    Зависимость допуска: занимает слот класса `endpoint_class` до получения
+    сессии и освобождает его после её закрытия.
+    """
+
+    async def dependency(
+        request_timeout: Annotated[
+            float | None,
+            Header(alias="X-Request-Timeout", gt=0, include_in_schema=False),
+        ] = None,
+    ) -> AsyncGenerator[None, None]:
+        async with admission.admit(endpoint_class, timeout=request_timeout):
+            yield
+
+    return dependency
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with sessionmaker() as session:
         yield session
@@ -48,6 +208,44 @@ async def get_organization_read_repo(
     return OrganizationReadRepository(session)
 
 
+def get_list_media_type(
+    accept: Annotated[str | None, Header(include_in_schema=False)] = None,
+) -> str:
+    return negotiate_media_type(accept)
+
+
+def get_fields(
+    fields: str | None = Query(
+        default=None,
+        description=(
+            "Поля карточки через запятую "
+            f"({', '.join(sorted(ORGANIZATION_FIELDS))}); по умолчанию — все"
+        ),
+    ),
+) -> frozenset[str] | None:
+    if not fields:
+        return None
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="fields must not be empty",
+        )
+    unknown = requested - ORGANIZATION_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return requested
+
+
+LIST_RESPONSE_CONTENT: dict[str, dict[str, Any]] = {
+    MEDIA_TYPE_COLUMNAR_JSON: {},
+    MEDIA_TYPE_MSGPACK: {},
+}
+
+
 @router.get(
     "",
     response_model=list[OrganizationDetail],
@@ -56,43 +254,162 @@ async def get_organization_read_repo(
         "Поиск организаций по фильтрам с логикой AND. "
         "Фильтры name/building/activity ищутся как подстрока (ILIKE), "
         "phone — точное совпадение. "
-        "Фильтр activity учитывает вложенные подкатегории (уровни 2 и 3)."
+        "Фильтр activity учитывает вложенные подкатегории (уровни 2 и 3). "
+        "Параметр q — полнотекстовый поиск по названию, адресу и видам "
+        "деятельности; при его наличии результаты упорядочены по релевантности. "
+        "С include_total=true общее число результатов возвращается в заголовке "
+        "X-Total-Count; X-Total-Count-Approximate: true означает оценку."
     ),
     responses={
         status.HTTP_200_OK: {
             "description": "Список организаций (может быть пустым)",
+            "content": LIST_RESPONSE_CONTENT,
         },
         status.HTTP_422_UNPROCESSABLE_ENTITY: {
             "description": "Не задан ни один фильтр",
         },
     },
+    dependencies=[Depends(admit("search"))],
 )
 async def list_organizations(
     org_repo: Annotated[
         OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
     ],
+    media_type: Annotated[str, Depends(get_list_media_type)],
+    fields: Annotated[frozenset[str] | None, Depends(get_fields)],
     name: str | None = Query(default=None),
     building: str | None = Query(default=None),
     phone: str | None = Query(default=None),
     activity: str | None = Query(default=None),
+    q: str | None = Query(default=None, description="Полнотекстовый запрос"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
-) -> list[OrganizationDetail]:
+    include_total: bool = Query(
+        default=False, description="Вернуть общее число результатов"
+    ),
+) -> Response:
     """Возвращает список организаций, подходящих под фильтры."""
-    if not any([name, building, phone, activity]):
+    if not any([name, building, phone, activity, q]):
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="At least one filter must be provided",
         )
 
-    return await org_repo.search(
+    organizations = await org_repo.search(
         name=name,
         building=building,
         phone=phone,
         activity=activity,
+        q=q,
         limit=limit,
         offset=offset,
+        fields=fields,
     )
+    response = render_organizations(organizations, media_type, fields)
+    if include_total:
+        count = await org_repo.count(
+            name=name,
+            building=building,
+            phone=phone,
+            activity=activity,
+            q=q,
+            exact_limit=EXACT_COUNT_THRESHOLD,
+        )
+        response.headers["X-Total-Count"] = str(count.total)
+        response.headers["X-Total-Count-Approximate"] = str(count.approximate).lower()
+    return response
+
+
+@router.get(
+    "/export",
+    summary="Потоковая выгрузка каталога",
+    description=(
+        "Выгружает все карточки организаций потоком через серверный курсор. "
+        "Форматы: NDJSON (format=ndjson) и Arrow IPC stream (format=arrow). "
+        "Необязательные фильтры: прямоугольник (все четыре границы) и activity "
+        "(с вложенными подкатегориями)."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {media_type: {} for media_type, _ in EXPORT_FORMATS.values()},
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Прямоугольник задан не полностью",
+        },
+    },
+    dependencies=[Depends(admit("export"))],
+)
+async def export_organizations(
+    org_repo: Annotated[
+        OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
+    ],
+    export_format: Literal["ndjson", "arrow"] = Query(default="ndjson", alias="format"),
+    min_lat: float | None = Query(default=None),
+    min_lon: float | None = Query(default=None),
+    max_lat: float | None = Query(default=None),
+    max_lon: float | None = Query(default=None),
+    activity: str | None = Query(default=None),
+) -> StreamingResponse:
+    """Стримит выгрузку каталога в выбранном формате."""
+    bbox = None
+    if (
+        min_lat is not None
+        and min_lon is not None
+        and max_lat is not None
+        and max_lon is not None
+    ):
+        bbox = GeoBBox(
+            min_lat=min_lat,
+            min_lon=min_lon,
+            max_lat=max_lat,
+            max_lon=max_lon,
+        )
+    elif any(bound is not None for bound in (min_lat, min_lon, max_lat, max_lon)):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="All bbox bounds must be provided",
+        )
+
+    media_type, encode = EXPORT_FORMATS[export_format]
+    batches = org_repo.stream_all(bbox=bbox, activity=activity)
+    return StreamingResponse(encode(batches), media_type=media_type)
+
+
+@router.get(
+    "/changes",
+    response_model=ChangeFeedPage,
+    summary="Лента изменений каталога",
+    description=(
+        "Возвращает изменённые и удалённые организации после позиции `since` "
+        "(keyset-пагинация). Для первой синхронизации `since` не передаётся; "
+        "далее передаётся `next_token` из предыдущего ответа, пока `has_more` "
+        "равно true."
+    ),
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Некорректный токен",
+        },
+    },
+    dependencies=[Depends(admit("search"))],
+)
+async def list_organization_changes(
+    org_repo: Annotated[
+        OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
+    ],
+    since: str | None = Query(default=None, description="Токен из next_token"),
+    limit: int = Query(default=500, ge=1, le=1000),
+) -> ChangeFeedPage:
+    """Возвращает страницу ленты изменений."""
+    try:
+        token = ChangeToken.parse(since) if since else ChangeToken()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid change token",
+        )
+
+    return await org_repo.list_changes(since=token, limit=limit)
 
 
 @router.get(
@@ -111,22 +428,24 @@ async def list_organizations(
             "description": "Организация с таким ID не найдена",
         },
     },
+    dependencies=[Depends(admit("lookup"))],
 )
 async def get_organization_by_id(
     org_id: UUID,
     org_repo: Annotated[
         OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
     ],
-):
+    fields: Annotated[frozenset[str] | None, Depends(get_fields)],
+) -> Response:
     """Возвращает организацию по её идентификатору."""
-    organization = await org_repo.get_by_id(organization_id=org_id)
+    organization = await org_repo.get_by_id(organization_id=org_id, fields=fields)
     if not organization:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Organization not found",
         )
 
-    return organization
+    return render_organization(organization, fields)
 
 
 @router.get(
@@ -138,11 +457,15 @@ async def get_organization_by_id(
         "прямоугольной области, заданной координатами.\n\n"
         "Используется фильтрация по координатам зданий (lat/lon)."
     ),
+    responses={status.HTTP_200_OK: {"content": LIST_RESPONSE_CONTENT}},
+    dependencies=[Depends(admit("search"))],
 )
 async def list_organizations_within_bbox(
     org_repo: Annotated[
         OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
     ],
+    media_type: Annotated[str, Depends(get_list_media_type)],
+    fields: Annotated[frozenset[str] | None, Depends(get_fields)],
     min_lat: float = Query(..., description="Минимальная широта (нижняя граница)"),
     min_lon: float = Query(..., description="Минимальная долгота (левая граница)"),
     max_lat: float = Query(..., description="Максимальная широта (верхняя граница)"),
@@ -155,7 +478,8 @@ async def list_organizations_within_bbox(
         max_lat=max_lat,
         max_lon=max_lon,
     )
-    return await org_repo.list_within_bbox(bbox=bbox)
+    organizations = await org_repo.list_within_bbox(bbox=bbox, fields=fields)
+    return render_organizations(organizations, media_type, fields)
 
 
 @router.get(
@@ -166,21 +490,60 @@ async def list_organizations_within_bbox(
         "Возвращает все организации, находящиеся в пределах радиуса от заданной точки.\n\n"
         "Реализация использует приближённый расчёт через bounding box (квадрат вокруг точки)."
     ),
+    responses={status.HTTP_200_OK: {"content": LIST_RESPONSE_CONTENT}},
+    dependencies=[Depends(admit("search"))],
 )
 async def list_organizations_within_radius(
     org_repo: Annotated[
         OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
     ],
+    media_type: Annotated[str, Depends(get_list_media_type)],
+    fields: Annotated[frozenset[str] | None, Depends(get_fields)],
     lat: float = Query(..., description="Широта центра"),
     lon: float = Query(..., description="Долгота центра"),
     radius_meters: float = Query(..., gt=0, description="Радиус в метрах"),
 ):
     """Возвращает организации в радиусе от точки."""
     center = GeoPoint(lat=lat, lon=lon)
-    return await org_repo.list_within_radius(
+    organizations = await org_repo.list_within_radius(
         center=center,
         radius_meters=radius_meters,
+        fields=fields,
+    )
+    return render_organizations(organizations, media_type, fields)
+
+
+@router.post(
+    "/geo/polygon",
+    response_model=list[OrganizationDetail],
+    summary="Найти организации внутри полигона",
+    description=(
+        "Возвращает организации, здания которых находятся внутри полигона "
+        "(GeoJSON Polygon, координаты в порядке [lon, lat]).\n\n"
+        "Кандидаты предварительно отбираются по описывающему прямоугольнику, "
+        "внутренние кольца полигона исключаются из области поиска."
+    ),
+    responses={status.HTTP_200_OK: {"content": LIST_RESPONSE_CONTENT}},
+    dependencies=[Depends(admit("search"))],
+)
+async def list_organizations_within_polygon(
+    org_repo: Annotated[
+        OrganizationReadRepositoryProtocol, Depends(get_organization_read_repo)
+    ],
+    media_type: Annotated[str, Depends(get_list_media_type)],
+    fields: Annotated[frozenset[str] | None, Depends(get_fields)],
+    polygon: GeoPolygon,
+    limit: int = Query(default=50, ge=1, le=200),
+    offset: int = Query(default=0, ge=0),
+):
+    """Возвращает организации внутри полигона."""
+    organizations = await org_repo.list_within_polygon(
+        polygon=polygon,
+        limit=limit,
+        offset=offset,
+        fields=fields,
     )
+    return render_organizations(organizations, media_type, fields)
 
 
 app.include_router(router)
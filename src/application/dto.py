@@ -1,6 +1,7 @@
+from typing import Any, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class OrganizationDetail(BaseModel):
@@ -21,6 +22,47 @@ class OrganizationDetail(BaseModel):
     )
 
 
+ORGANIZATION_FIELDS = frozenset(OrganizationDetail.model_fields)
+
+
+class ResultCount(BaseModel):
+    """
+    Общее число найденных организаций
+    """
+    total: int
+    approximate: bool = False
+
+
+class ChangeToken(BaseModel):
+    """
+    Позиция в ленте изменений: транзакция и версия последней выданной записи
+    """
+    txid: int = Field(default=0, ge=0, lt=2**64)
+    version: int = Field(default=0, ge=0)
+
+    @classmethod
+    def parse(cls, token: str) -> "ChangeToken":
+        txid, _, version = token.partition(".")
+        return cls(txid=int(txid), version=int(version))
+
+    def __str__(self) -> str:
+        return f"{self.txid}.{self.version}"
+
+
+class OrganizationChange(BaseModel):
+    id: UUID = Field(..., description="Идентефикатор организации")
+    deleted: bool = Field(..., description="Организация удалена")
+    organization: OrganizationDetail | None = Field(
+        default=None, description="Актуальная карточка (для неудалённых)"
+    )
+
+
+class ChangeFeedPage(BaseModel):
+    changes: list[OrganizationChange]
+    next_token: str = Field(..., description="Токен для следующего запроса")
+    has_more: bool = Field(..., description="Есть ли ещё изменения")
+
+
 class GeoBBox(BaseModel):
     """
     Прямоугольная область
@@ -29,3 +71,77 @@ class GeoBBox(BaseModel):
     max_lat: float
     min_lon: float
     max_lon: float
+
+
+class GeoPolygon(BaseModel):
+    """
+    Полигон в формате GeoJSON (координаты в порядке [lon, lat]).
+    Первое кольцо — внешняя граница, остальные — «дыры».
+    Высота (третья координата) допускается и отбрасывается.
+    """
+    type: Literal["Polygon"] = "Polygon"
+    coordinates: list[list[tuple[float, float]]] = Field(
+        ...,
+        min_length=1,
+        examples=[
+            [[[37.60, 55.75], [37.65, 55.75], [37.65, 55.78], [37.60, 55.75]]],
+        ],
+    )
+
+    @field_validator("coordinates", mode="before")
+    @classmethod
+    def _drop_altitude(cls, rings: Any) -> Any:
+        if not isinstance(rings, list):
+            return rings
+        normalized = []
+        for ring in rings:
+            if not isinstance(ring, list):
+                return rings
+            positions = []
+            for position in ring:
+                if isinstance(position, (list, tuple)) and len(position) == 3:
+                    position = position[:2]
+                positions.append(position)
+            normalized.append(positions)
+        return normalized
+
+    @field_validator("coordinates")
+    @classmethod
+    def _validate_rings(
+        cls, rings: list[list[tuple[float, float]]]
+    ) -> list[list[tuple[float, float]]]:
+        for ring in rings:
+            if len(ring) < 4:
+                raise ValueError("Polygon ring must contain at least 4 positions")
+            if ring[0] != ring[-1]:
+                raise ValueError("Polygon ring must be closed")
+            for lon, lat in ring:
+                if not -180 <= lon <= 180 or not -90 <= lat <= 90:
+                    raise ValueError(
+                        "Position must satisfy lon in [-180, 180], lat in [-90, 90]"
+                    )
+            for (lon1, _), (lon2, _) in zip(ring, ring[1:]):
+                if abs(lon2 - lon1) > 180:
+                    raise ValueError(
+                        "Polygon crossing the antimeridian must be split (RFC 7946, 3.1.9)"
+                    )
+        return rings
+
+    @property
+    def exterior(self) -> list[tuple[float, float]]:
+        return self.coordinates[0]
+
+    @property
+    def holes(self) -> list[list[tuple[float, float]]]:
+        return self.coordinates[1:]
+
+    def envelope(self) -> GeoBBox:
+        """Описывающий прямоугольник внешнего кольца."""
+        lons = [lon for lon, _ in self.exterior]
+        lats = [lat for _, lat in self.exterior]
+        return GeoBBox(
+            min_lat=min(lats),
+            max_lat=max(lats),
+            min_lon=min(lons),
+            max_lon=max(lons),
+        )
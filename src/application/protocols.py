@@ -1,11 +1,26 @@
+from collections.abc import AsyncIterator
 from typing import Protocol, Sequence
 from uuid import UUID
 
-from application.dto import GeoBBox, OrganizationDetail
+from application.dto import (
+    ChangeFeedPage,
+    ChangeToken,
+    GeoBBox,
+    GeoPolygon,
+    OrganizationDetail,
+    ResultCount,
+)
 from domain.entities import GeoPoint
 
 
 class OrganizationReadRepositoryProtocol(Protocol):
+    """
+    Чтение карточек организаций.
+
+    Параметр `fields` ограничивает набор полей, которые нужно вычислить;
+    не запрошенные списочные поля возвращаются пустыми.
+    """
+
     async def search(
         self,
         *,
@@ -13,17 +28,47 @@ class OrganizationReadRepositoryProtocol(Protocol):
         building: str | None,
         phone: str | None,
         activity: str | None,
+        q: str | None = None,
         limit: int = 50,
         offset: int = 0,
+        fields: frozenset[str] | None = None,
     ) -> Sequence[OrganizationDetail]:
-        """Поиск организаций по набору фильтров."""
+        """Поиск организаций по набору фильтров и полнотекстовому запросу."""
         ...
 
-    async def get_by_id(self, *, organization_id: UUID) -> OrganizationDetail | None:
+    async def count(
+        self,
+        *,
+        name: str | None,
+        building: str | None,
+        phone: str | None,
+        activity: str | None,
+        q: str | None = None,
+        exact_limit: int = 10_000,
+    ) -> ResultCount:
+        """
+        Число организаций, подходящих под фильтры `search`.
+
+        Точный подсчёт выполняется до `exact_limit` строк, сверх него
+        возвращается оценка планировщика.
+        """
+        ...
+
+    async def get_by_id(
+        self,
+        *,
+        organization_id: UUID,
+        fields: frozenset[str] | None = None,
+    ) -> OrganizationDetail | None:
         """Вывод информации об организации по её идентификатору."""
         ...
 
-    async def list_within_bbox(self, *, bbox: GeoBBox) -> list[OrganizationDetail]:
+    async def list_within_bbox(
+        self,
+        *,
+        bbox: GeoBBox,
+        fields: frozenset[str] | None = None,
+    ) -> list[OrganizationDetail]:
         """Поиск по прямоугольнику."""
         ...
 
@@ -32,6 +77,37 @@ class OrganizationReadRepositoryProtocol(Protocol):
         *,
         center: GeoPoint,
         radius_meters: float,
+        fields: frozenset[str] | None = None,
     ) -> Sequence[OrganizationDetail]:
         """Поиск по радиусу."""
         ...
+
+    async def list_within_polygon(
+        self,
+        *,
+        polygon: GeoPolygon,
+        limit: int = 50,
+        offset: int = 0,
+        fields: frozenset[str] | None = None,
+    ) -> Sequence[OrganizationDetail]:
+        """Поиск по произвольному полигону."""
+        ...
+
+    async def list_changes(
+        self,
+        *,
+        since: ChangeToken,
+        limit: int = 500,
+    ) -> ChangeFeedPage:
+        """Изменения и удаления организаций после позиции `since`."""
+        ...
+
+    def stream_all(
+        self,
+        *,
+        bbox: GeoBBox | None = None,
+        activity: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[OrganizationDetail]]:
+        """Потоковая выгрузка всех карточек пачками."""
+        ...
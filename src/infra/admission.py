@@ -0,0 +1,198 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, endpoint_class: str, retry_after: float) -> None:
+        super().__init__(f"Admission rejected for {endpoint_class!r}")
+        self.endpoint_class = endpoint_class
+        self.retry_after = retry_after
+
+
+@dataclass(slots=True, kw_only=True)
+class EndpointClass:
+    """Параметры допуска для класса эндпоинтов."""
+
+    name: str
+    priority: int
+    max_in_flight: int
+    max_queue: int
+    max_wait: float
+    service_time: float = 0.05
+    in_flight: int = 0
+    queued: int = 0
+    admitted: int = 0
+    shed: int = 0
+
+
+@dataclass(order=True, slots=True)
+class _Waiter:
+    priority: int
+    seq: int
+    endpoint_class: EndpointClass = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Ограничивает число одновременных запросов к БД.
+
+    Запросы сверх `capacity` ждут в очереди с приоритетами (меньшее значение
+    `priority` обслуживается раньше). Запрос отклоняется сразу, если очередь
+    класса заполнена или оценка ожидания превышает его бюджет (`max_wait`
+    или таймаут клиента), а также если бюджет истёк в очереди.
+
+    Классы с более низким приоритетом вместе должны оставлять хотя бы один
+    слот для самого приоритетного класса.
+    """
+
+    def __init__(self, *, capacity: int, classes: list[EndpointClass]) -> None:
+        top_priority = min(endpoint_class.priority for endpoint_class in classes)
+        shared = sum(
+            endpoint_class.max_in_flight
+            for endpoint_class in classes
+            if endpoint_class.priority > top_priority
+        )
+        if shared >= capacity:
+            raise ValueError(
+                f"Lower-priority classes may hold {shared} of {capacity} slots; "
+                "leave at least one for the highest-priority class"
+            )
+        self.capacity = capacity
+        self.classes = {endpoint_class.name: endpoint_class for endpoint_class in classes}
+        self.in_flight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        name: str,
+        *,
+        timeout: float | None = None,
+    ) -> AsyncIterator[None]:
+        endpoint_class = self.classes[name]
+        await self._acquire(endpoint_class, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe(endpoint_class, time.monotonic() - started)
+            self._release(endpoint_class)
+
+    def _can_run(self, endpoint_class: EndpointClass) -> bool:
+        return (
+            self.in_flight < self.capacity
+            and endpoint_class.in_flight < endpoint_class.max_in_flight
+        )
+
+    def _estimated_wait(self, endpoint_class: EndpointClass) -> float:
+        # Каждый класс ведёт своё среднее время обслуживания, чтобы долгие
+        # выгрузки не завышали оценку для быстрых запросов.
+        ahead = sum(
+            waiter.endpoint_class.service_time
+            for waiter in self._waiters
+            if waiter.priority <= endpoint_class.priority
+        )
+        return (ahead + endpoint_class.service_time) / max(self.capacity, 1)
+
+    async def _acquire(self, endpoint_class: EndpointClass, timeout: float | None) -> None:
+        has_precedence = not any(
+            waiter.priority <= endpoint_class.priority for waiter in self._waiters
+        )
+        if has_precedence and self._can_run(endpoint_class):
+            self._start(endpoint_class)
+            return
+
+        budget = endpoint_class.max_wait
+        if timeout is not None:
+            budget = min(budget, timeout)
+        estimated_wait = self._estimated_wait(endpoint_class)
+        if endpoint_class.queued >= endpoint_class.max_queue or estimated_wait > budget:
+            self._reject(endpoint_class, estimated_wait)
+
+        waiter = _Waiter(
+            endpoint_class.priority,
+            next(self._seq),
+            endpoint_class,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._waiters, waiter)
+        endpoint_class.queued += 1
+        try:
+            async with asyncio.timeout(budget):
+                await waiter.future
+        except BaseException as exc:
+            granted = waiter.future.done() and not waiter.future.cancelled()
+            if granted and isinstance(exc, TimeoutError):
+                # Слот выдан одновременно с истечением дедлайна — используем его.
+                return
+            if granted:
+                self._release(endpoint_class)
+            elif waiter in self._waiters:
+                # _wake мог уже выбросить ожидающего с отменённым future.
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            if isinstance(exc, TimeoutError):
+                self._reject(endpoint_class, self._estimated_wait(endpoint_class))
+            raise
+        finally:
+            endpoint_class.queued -= 1
+
+    def _start(self, endpoint_class: EndpointClass) -> None:
+        self.in_flight += 1
+        endpoint_class.in_flight += 1
+        endpoint_class.admitted += 1
+
+    def _release(self, endpoint_class: EndpointClass) -> None:
+        self.in_flight -= 1
+        endpoint_class.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        skipped: list[_Waiter] = []
+        while self._waiters and self.in_flight < self.capacity:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.future.done():
+                continue
+            if not self._can_run(waiter.endpoint_class):
+                skipped.append(waiter)
+                continue
+            self._start(waiter.endpoint_class)
+            waiter.future.set_result(None)
+        for waiter in skipped:
+            heapq.heappush(self._waiters, waiter)
+
+    def _reject(self, endpoint_class: EndpointClass, estimated_wait: float) -> None:
+        endpoint_class.shed += 1
+        raise AdmissionRejected(endpoint_class.name, max(1.0, math.ceil(estimated_wait)))
+
+    def _observe(self, endpoint_class: EndpointClass, elapsed: float) -> None:
+        endpoint_class.service_time = 0.9 * endpoint_class.service_time + 0.1 * elapsed
+
+    def render_metrics(self) -> str:
+        """Метрики в текстовом формате Prometheus."""
+        lines = [
+            "# TYPE admission_in_flight gauge",
+            f"admission_in_flight {self.in_flight}",
+            "# TYPE admission_capacity gauge",
+            f"admission_capacity {self.capacity}",
+        ]
+        metrics = (
+            ("admission_class_in_flight", "gauge", "in_flight"),
+            ("admission_queue_depth", "gauge", "queued"),
+            ("admission_admitted_total", "counter", "admitted"),
+            ("admission_shed_total", "counter", "shed"),
+        )
+        for metric, kind, attr in metrics:
+            lines.append(f"# TYPE {metric} {kind}")
+            for endpoint_class in self.classes.values():
+                value = getattr(endpoint_class, attr)
+                lines.append(f'{metric}{{class="{endpoint_class.name}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,26 @@
+"""Add buildings lat/lon index
+
+Revision ID: 14b045b0b0f8
+Revises: d6f2b9b52c02
+Create Date: 2026-10-19 10:12:04.118305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "14b045b0b0f8"
+down_revision: Union[str, Sequence[str], None] = "d6f2b9b52c02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_buildings_lat_lon", "buildings", ["lat", "lon"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_buildings_lat_lon", table_name="buildings")
@@ -0,0 +1,186 @@
+"""Add organizations search vector
+
+Revision ID: 2ae29bb1cd56
+Revises: 14b045b0b0f8
+Create Date: 2026-10-19 11:03:27.541920
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "2ae29bb1cd56"
+down_revision: Union[str, Sequence[str], None] = "14b045b0b0f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "organizations",
+        sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True),
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION organization_search_vector(
+            org_id uuid, org_name text, org_building_id uuid
+        ) RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT
+                setweight(to_tsvector('russian', coalesce(org_name, '')), 'A')
+                || setweight(
+                    to_tsvector(
+                        'russian',
+                        coalesce(
+                            (SELECT b.address FROM buildings b WHERE b.id = org_building_id),
+                            ''
+                        )
+                    ),
+                    'B'
+                )
+                || setweight(
+                    to_tsvector(
+                        'russian',
+                        coalesce(
+                            (
+                                SELECT string_agg(a.name, ' ')
+                                FROM organization_activities oa
+                                JOIN activities a ON a.id = oa.activity_id
+                                WHERE oa.organization_id = org_id
+                            ),
+                            ''
+                        )
+                    ),
+                    'C'
+                )
+        $$
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION organizations_search_vector_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := organization_search_vector(NEW.id, NEW.name, NEW.building_id);
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organizations_search_vector_update
+        BEFORE INSERT OR UPDATE OF name, building_id ON organizations
+        FOR EACH ROW EXECUTE FUNCTION organizations_search_vector_trigger()
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION buildings_search_vector_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE organizations o
+            SET search_vector = organization_search_vector(o.id, o.name, o.building_id)
+            WHERE o.building_id = NEW.id;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER buildings_search_vector_update
+        AFTER UPDATE OF address ON buildings
+        FOR EACH ROW EXECUTE FUNCTION buildings_search_vector_trigger()
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION activities_search_vector_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE organizations o
+            SET search_vector = organization_search_vector(o.id, o.name, o.building_id)
+            WHERE o.id IN (
+                SELECT oa.organization_id
+                FROM organization_activities oa
+                WHERE oa.activity_id = NEW.id
+            );
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER activities_search_vector_update
+        AFTER UPDATE OF name ON activities
+        FOR EACH ROW EXECUTE FUNCTION activities_search_vector_trigger()
+        """
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION organization_activities_search_vector_trigger() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE organizations o
+                SET search_vector = organization_search_vector(o.id, o.name, o.building_id)
+                WHERE o.id = OLD.organization_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE organizations o
+                SET search_vector = organization_search_vector(o.id, o.name, o.building_id)
+                WHERE o.id = NEW.organization_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organization_activities_search_vector_update
+        AFTER INSERT OR UPDATE OR DELETE ON organization_activities
+        FOR EACH ROW EXECUTE FUNCTION organization_activities_search_vector_trigger()
+        """
+    )
+
+    op.execute(
+        """
+        UPDATE organizations o
+        SET search_vector = organization_search_vector(o.id, o.name, o.building_id)
+        """
+    )
+    op.create_index(
+        "ix_organizations_search_vector",
+        "organizations",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_organizations_search_vector", table_name="organizations")
+    op.execute(
+        "DROP TRIGGER organization_activities_search_vector_update ON organization_activities"
+    )
+    op.execute("DROP TRIGGER activities_search_vector_update ON activities")
+    op.execute("DROP TRIGGER buildings_search_vector_update ON buildings")
+    op.execute("DROP TRIGGER organizations_search_vector_update ON organizations")
+    op.execute("DROP FUNCTION organization_activities_search_vector_trigger()")
+    op.execute("DROP FUNCTION activities_search_vector_trigger()")
+    op.execute("DROP FUNCTION buildings_search_vector_trigger()")
+    op.execute("DROP FUNCTION organizations_search_vector_trigger()")
+    op.execute("DROP FUNCTION organization_search_vector(uuid, text, uuid)")
+    op.drop_column("organizations", "search_vector")
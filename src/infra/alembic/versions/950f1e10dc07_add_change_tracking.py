@@ -0,0 +1,231 @@
+"""Add change tracking
+
+Revision ID: 950f1e10dc07
+Revises: 2ae29bb1cd56
+Create Date: 2026-10-19 14:21:45.803116
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "950f1e10dc07"
+down_revision: Union[str, Sequence[str], None] = "2ae29bb1cd56"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRACKED_TABLES = (
+    "buildings",
+    "organizations",
+    "organization_phones",
+    "organization_activities",
+)
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema.
+
+    Каждая запись получает version из общей последовательности и txid
+    транзакции, удаления пишутся в tombstones. Лента изменений читает
+    строки в порядке (txid, version) только из завершённых транзакций.
+    """
+    op.execute("CREATE SEQUENCE catalog_change_seq")
+
+    for table in TRACKED_TABLES:
+        op.add_column(
+            table,
+            sa.Column(
+                "version",
+                sa.BigInteger(),
+                server_default=sa.text("nextval('catalog_change_seq')"),
+                nullable=False,
+            ),
+        )
+        op.add_column(
+            table,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("now()"),
+                nullable=False,
+            ),
+        )
+        op.execute(
+            f"ALTER TABLE {table} "
+            "ADD COLUMN txid xid8 NOT NULL DEFAULT pg_current_xact_id()"
+        )
+
+    op.create_table(
+        "tombstones",
+        sa.Column(
+            "version",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('catalog_change_seq')"),
+            nullable=False,
+        ),
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("row_key", postgresql.JSONB(), nullable=False),
+        sa.Column("organization_id", sa.UUID(), nullable=True),
+        sa.Column(
+            "deleted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("version"),
+    )
+    op.execute(
+        "ALTER TABLE tombstones "
+        "ADD COLUMN txid xid8 NOT NULL DEFAULT pg_current_xact_id()"
+    )
+    op.create_index("ix_tombstones_txid_version", "tombstones", ["txid", "version"])
+    op.create_index(
+        "ix_organizations_txid_version", "organizations", ["txid", "version"]
+    )
+
+    op.execute(
+        """
+        CREATE FUNCTION track_row_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.version := nextval('catalog_change_seq');
+            NEW.updated_at := now();
+            NEW.txid := pg_current_xact_id();
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION record_tombstone() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            key jsonb := to_jsonb(OLD) - 'version' - 'updated_at' - 'txid' - 'search_vector';
+        BEGIN
+            INSERT INTO tombstones (table_name, row_key, organization_id)
+            VALUES (
+                TG_TABLE_NAME,
+                key,
+                CASE
+                    WHEN TG_TABLE_NAME = 'organizations' THEN (key ->> 'id')::uuid
+                    ELSE (key ->> 'organization_id')::uuid
+                END
+            );
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for table in TRACKED_TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_track_change
+            BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION track_row_change()
+            """
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_tombstone
+            AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_tombstone()
+            """
+        )
+
+    # Изменения телефонов, связей, адреса и названий деятельностей меняют
+    # карточку организации — поднимаем её версию.
+    op.execute(
+        """
+        CREATE FUNCTION touch_organization_from_child() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE organizations SET version = version WHERE id = OLD.organization_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE organizations SET version = version WHERE id = NEW.organization_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    for table in ("organization_phones", "organization_activities"):
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_touch_organization
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION touch_organization_from_child()
+            """
+        )
+    op.execute(
+        """
+        CREATE FUNCTION touch_organizations_from_building() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE organizations SET version = version WHERE building_id = NEW.id;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER buildings_touch_organizations
+        AFTER UPDATE OF address ON buildings
+        FOR EACH ROW EXECUTE FUNCTION touch_organizations_from_building()
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION touch_organizations_from_activity() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE organizations SET version = version
+            WHERE id IN (
+                SELECT oa.organization_id
+                FROM organization_activities oa
+                WHERE oa.activity_id = NEW.id
+            );
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER activities_touch_organizations
+        AFTER UPDATE OF name ON activities
+        FOR EACH ROW EXECUTE FUNCTION touch_organizations_from_activity()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER activities_touch_organizations ON activities")
+    op.execute("DROP TRIGGER buildings_touch_organizations ON buildings")
+    for table in ("organization_phones", "organization_activities"):
+        op.execute(f"DROP TRIGGER {table}_touch_organization ON {table}")
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_tombstone ON {table}")
+        op.execute(f"DROP TRIGGER {table}_track_change ON {table}")
+    op.execute("DROP FUNCTION touch_organizations_from_activity()")
+    op.execute("DROP FUNCTION touch_organizations_from_building()")
+    op.execute("DROP FUNCTION touch_organization_from_child()")
+    op.execute("DROP FUNCTION record_tombstone()")
+    op.execute("DROP FUNCTION track_row_change()")
+
+    op.drop_index("ix_organizations_txid_version", table_name="organizations")
+    op.drop_index("ix_tombstones_txid_version", table_name="tombstones")
+    op.drop_table("tombstones")
+    for table in TRACKED_TABLES:
+        op.drop_column(table, "txid")
+        op.drop_column(table, "updated_at")
+        op.drop_column(table, "version")
+    op.execute("DROP SEQUENCE catalog_change_seq")
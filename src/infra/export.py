@@ -0,0 +1,68 @@
+import io
+from collections.abc import AsyncIterable, AsyncIterator
+
+import orjson
+
+from application.dto import OrganizationDetail
+
+
+async def encode_ndjson(
+    batches: AsyncIterable[list[OrganizationDetail]],
+) -> AsyncIterator[bytes]:
+    """Кодирует пачки карточек в NDJSON (одна карточка на строку)."""
+    async for batch in batches:
+        yield b"".join(
+            orjson.dumps(item.model_dump(), option=orjson.OPT_APPEND_NEWLINE)
+            for item in batch
+        )
+
+
+async def encode_arrow(
+    batches: AsyncIterable[list[OrganizationDetail]],
+) -> AsyncIterator[bytes]:
+    """
+    Кодирует пачки карточек в поток Arrow IPC: одна пачка — один RecordBatch.
+
+    pyarrow импортируется лениво, чтобы не утяжелять старт API.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [
+            ("id", pa.string()),
+            ("name", pa.string()),
+            ("address", pa.string()),
+            ("phone_numbers", pa.list_(pa.string())),
+            ("activities", pa.list_(pa.string())),
+        ]
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        async for batch in batches:
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        [str(item.id) for item in batch],
+                        [item.name for item in batch],
+                        [item.address for item in batch],
+                        [item.phone_numbers for item in batch],
+                        [item.activities for item in batch],
+                    ],
+                    schema=schema,
+                )
+            )
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", encode_ndjson),
+    "arrow": ("application/vnd.apache.arrow.stream", encode_arrow),
+}
@@ -1,45 +1,66 @@
 import math
+from collections.abc import AsyncIterator
+from typing import Any
 from uuid import UUID
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.dto import GeoBBox, OrganizationDetail
+from application.dto import (
+    ChangeFeedPage,
+    ChangeToken,
+    GeoBBox,
+    GeoPolygon,
+    OrganizationChange,
+    OrganizationDetail,
+    ResultCount,
+)
 from domain.entities import GeoPoint
 
-_BASE_CTES = (
-    """
+_AGGREGATE_CTES = {
+    "phone_numbers": """
     phones AS (
         SELECT
             op.organization_id,
             array_agg(DISTINCT op.phone) AS phone_numbers
         FROM organization_phones op
+        {scope}
         GROUP BY op.organization_id
     )
     """,
-    """
+    "activities": """
     acts AS (
         SELECT
             oa.organization_id,
             array_agg(DISTINCT a.name) AS activities
         FROM organization_activities oa
         JOIN activities a ON a.id = oa.activity_id
+        {scope}
         GROUP BY oa.organization_id
     )
     """,
-)
+}
+
+_AGGREGATE_COLUMNS = {
+    "phone_numbers": (
+        "COALESCE(p.phone_numbers, ARRAY[]::text[]) AS phone_numbers",
+        "LEFT JOIN phones p ON p.organization_id = o.id",
+    ),
+    "activities": (
+        "COALESCE(x.activities, ARRAY[]::text[]) AS activities",
+        "LEFT JOIN acts x ON x.organization_id = o.id",
+    ),
+}
 
 _BASE_SELECT = """
 SELECT
     o.id AS id,
     o.name AS name,
     b.address AS address,
-    COALESCE(p.phone_numbers, ARRAY[]::text[]) AS phone_numbers,
-    COALESCE(x.activities, ARRAY[]::text[]) AS activities
+    {aggregates}
 FROM organizations o
 JOIN buildings b ON b.id = o.building_id
-LEFT JOIN phones p ON p.organization_id = o.id
-LEFT JOIN acts x ON x.organization_id = o.id
+{joins}
 """
 
 
@@ -47,11 +68,28 @@ class OrganizationReadRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_id(self, *, organization_id: UUID) -> OrganizationDetail | None:
+    async def warmup(self) -> None:
+        """
+        Выполняет основные формы запросов на текущем соединении, чтобы
+        asyncpg закэшировал их подготовленные выражения, а сервер — планы.
+        """
+        empty_bbox = GeoBBox(min_lat=0.0, max_lat=-1.0, min_lon=0.0, max_lon=-1.0)
+        await self.get_by_id(organization_id=UUID(int=0))
+        await self.list_within_bbox(bbox=empty_bbox)
+        await self.search(name="-", building=None, phone=None, activity=None)
+        await self.search(name=None, building=None, phone=None, activity=None, q="-")
+        await self.search(name=None, building=None, phone=None, activity="-")
+
+    async def get_by_id(
+        self,
+        *,
+        organization_id: UUID,
+        fields: frozenset[str] | None = None,
+    ) -> OrganizationDetail | None:
         """Возвращает карточку организации по идентификатору."""
         sql = f"""
-        WITH {self._build_ctes(None)}
-        {_BASE_SELECT}
+        {self._build_ctes(None, fields=fields)}
+        {self._build_select(fields)}
         WHERE o.id = :org_id
         """
         return await self._execute_one(sql, {"org_id": organization_id})
@@ -63,33 +101,100 @@ class OrganizationReadRepository:
         building: str | None,
         phone: str | None,
         activity: str | None,
+        q: str | None = None,
         limit: int = 50,
         offset: int = 0,
+        fields: frozenset[str] | None = None,
     ) -> list[OrganizationDetail]:
-        """Ищет организации по фильтрам с логикой AND."""
-        assert any([name, building, phone, activity])
+        """
+        Ищет организации по фильтрам с логикой AND.
+
+        При заданном `q` результаты упорядочены по релевантности (ts_rank).
+        """
+        assert any([name, building, phone, activity, q])
         where_sql, params = self._build_where(
             name=name,
             building=building,
             phone=phone,
             activity=activity,
+            q=q,
         )
         params.update({"limit": limit, "offset": offset})
+        order_sql = "o.name"
+        if q:
+            order_sql = (
+                "ts_rank(o.search_vector, websearch_to_tsquery('russian', :q)) DESC, o.name"
+            )
         sql = f"""
-        WITH {self._build_ctes(activity)}
-        {_BASE_SELECT}
+        {self._build_ctes(activity, fields=fields)}
+        {self._build_select(fields)}
         {where_sql}
-        ORDER BY o.name
+        ORDER BY {order_sql}
         LIMIT :limit
         OFFSET :offset
         """
         return await self._execute_many(sql, params)
 
-    async def list_within_bbox(self, *, bbox: GeoBBox) -> list[OrganizationDetail]:
+    async def count(
+        self,
+        *,
+        name: str | None,
+        building: str | None,
+        phone: str | None,
+        activity: str | None,
+        q: str | None = None,
+        exact_limit: int = 10_000,
+    ) -> ResultCount:
+        """
+        Считает организации под фильтрами `search` без агрегатов карточек.
+
+        Подсчёт ограничен `exact_limit + 1` строками; если предел достигнут,
+        возвращается оценка планировщика с признаком `approximate`.
+        """
+        assert any([name, building, phone, activity, q])
+        where_sql, params = self._build_where(
+            name=name,
+            building=building,
+            phone=phone,
+            activity=activity,
+            q=q,
+        )
+        ctes_sql = self._build_ctes(activity, fields=frozenset())
+        matches_sql = f"""
+        SELECT 1
+        FROM organizations o
+        JOIN buildings b ON b.id = o.building_id
+        {where_sql}
+        """
+
+        sql = f"""
+        {ctes_sql}
+        SELECT count(*) FROM ({matches_sql} LIMIT :count_limit) AS matches
+        """
+        result = await self.session.execute(
+            text(sql), {**params, "count_limit": exact_limit + 1}
+        )
+        total: int = result.scalar_one()
+        if total <= exact_limit:
+            return ResultCount(total=total)
+
+        result = await self.session.execute(
+            text(f"EXPLAIN (FORMAT JSON) {ctes_sql} {matches_sql}"), params
+        )
+        plan: list[dict[str, Any]] = result.scalar_one()
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        return ResultCount(total=max(estimate, total), approximate=True)
+
+    async def list_within_bbox(
+        self,
+        *,
+        bbox: GeoBBox,
+        fields: frozenset[str] | None = None,
+    ) -> list[OrganizationDetail]:
         """Возвращает организации, чьи здания попадают в прямоугольник."""
         sql = f"""
-        WITH {self._build_ctes(None)}
-        {_BASE_SELECT}
+        {self._build_ctes(None, fields=fields)}
+        {self._build_select(fields)}
         WHERE (b.lat BETWEEN :min_lat AND :max_lat)
           AND (b.lon BETWEEN :min_lon AND :max_lon)
         ORDER BY o.name
@@ -107,6 +212,7 @@ class OrganizationReadRepository:
         *,
         center: GeoPoint,
         radius_meters: float,
+        fields: frozenset[str] | None = None,
     ) -> list[OrganizationDetail]:
         """Ищет организации в радиусе через аппроксимацию bounding box."""
         meters_per_deg = 111_320.0
@@ -119,10 +225,230 @@ class OrganizationReadRepository:
             min_lon=center.lon - dlon,
             max_lon=center.lon + dlon,
         )
-        return await self.list_within_bbox(bbox=bbox)
+        return await self.list_within_bbox(bbox=bbox, fields=fields)
+
+    async def list_within_polygon(
+        self,
+        *,
+        polygon: GeoPolygon,
+        limit: int = 50,
+        offset: int = 0,
+        fields: frozenset[str] | None = None,
+    ) -> list[OrganizationDetail]:
+        """
+        Ищет организации внутри полигона.
+
+        Кандидаты отбираются по описывающему прямоугольнику (индекс
+        ix_buildings_lat_lon), затем проверяются оператором `<@` встроенного
+        типа polygon. Граница полигона, включая границы «дыр», считается его
+        частью: исключаются только точки строго внутри дыры. Агрегаты
+        телефонов и деятельностей считаются только для организаций текущей
+        страницы.
+        """
+        envelope = polygon.envelope()
+        params: dict[str, object] = {
+            "min_lat": envelope.min_lat,
+            "max_lat": envelope.max_lat,
+            "min_lon": envelope.min_lon,
+            "max_lon": envelope.max_lon,
+            "exterior": self._polygon_literal(polygon.exterior),
+            "limit": limit,
+            "offset": offset,
+        }
+        conditions = [
+            "b.lat BETWEEN :min_lat AND :max_lat",
+            "b.lon BETWEEN :min_lon AND :max_lon",
+            "point(b.lon, b.lat) <@ CAST(CAST(:exterior AS text) AS polygon)",
+        ]
+        for i, hole in enumerate(polygon.holes):
+            # Точка на границе дыры (замкнутый path) остаётся в выборке.
+            conditions.append(
+                f"NOT (point(b.lon, b.lat) <@ CAST(CAST(:hole_{i} AS text) AS polygon)"
+                f" AND NOT (point(b.lon, b.lat) <@ CAST(CAST(:hole_{i} AS text) AS path)))"
+            )
+            params[f"hole_{i}"] = self._polygon_literal(hole)
+        where_sql = " AND ".join(f"({condition})" for condition in conditions)
+
+        page_cte = f"""
+        page AS (
+            SELECT o.id
+            FROM organizations o
+            JOIN buildings b ON b.id = o.building_id
+            WHERE {where_sql}
+            ORDER BY o.name, o.id
+            LIMIT :limit
+            OFFSET :offset
+        )
+        """
+        sql = f"""
+        {self._build_ctes(None, fields=fields, page=page_cte)}
+        {self._build_select(fields)}
+        WHERE o.id IN (SELECT id FROM page)
+        ORDER BY o.name, o.id
+        """
+        return await self._execute_many(sql, params)
+
+    async def list_changes(
+        self,
+        *,
+        since: ChangeToken,
+        limit: int = 500,
+    ) -> ChangeFeedPage:
+        """
+        Возвращает изменения организаций после `since` в порядке (txid, version).
+
+        Выдаются только записи транзакций старше самой старой активной
+        (pg_snapshot_xmin), поэтому транзакция, зафиксированная позже, не
+        окажется позади уже выданного токена.
+        """
+        params: dict[str, object] = {
+            "since_txid": str(since.txid),
+            "since_version": since.version,
+            "limit": limit,
+        }
+        sql = """
+        WITH horizon AS (
+            SELECT pg_snapshot_xmin(pg_current_snapshot()) AS xmin
+        )
+        SELECT id, txid::text AS txid, version, deleted
+        FROM (
+            (
+                SELECT o.id, o.txid, o.version, false AS deleted
+                FROM organizations o, horizon h
+                WHERE o.txid < h.xmin
+                  AND (o.txid, o.version)
+                    > (CAST(CAST(:since_txid AS text) AS xid8), :since_version)
+                ORDER BY o.txid, o.version
+                LIMIT :limit
+            )
+            UNION ALL
+            (
+                SELECT t.organization_id, t.txid, t.version, true AS deleted
+                FROM tombstones t, horizon h
+                WHERE t.table_name = 'organizations'
+                  AND t.txid < h.xmin
+                  AND (t.txid, t.version)
+                    > (CAST(CAST(:since_txid AS text) AS xid8), :since_version)
+                ORDER BY t.txid, t.version
+                LIMIT :limit
+            )
+        ) AS changes
+        ORDER BY changes.txid, changes.version
+        LIMIT :limit
+        """
+        result = await self.session.execute(text(sql), params)
+        rows = result.mappings().all()
+
+        live_ids = [row["id"] for row in rows if not row["deleted"]]
+        cards: dict[UUID, OrganizationDetail] = {}
+        if live_ids:
+            page_cte = "page AS (SELECT unnest(CAST(:ids AS uuid[])) AS id)"
+            cards_sql = f"""
+            {self._build_ctes(None, page=page_cte)}
+            {self._build_select(None)}
+            WHERE o.id IN (SELECT id FROM page)
+            """
+            cards = {
+                card.id: card
+                for card in await self._execute_many(cards_sql, {"ids": live_ids})
+            }
+
+        changes = [
+            OrganizationChange(
+                id=row["id"],
+                deleted=row["deleted"] or row["id"] not in cards,
+                organization=cards.get(row["id"]),
+            )
+            for row in rows
+        ]
+        next_token = since
+        if rows:
+            next_token = ChangeToken(txid=int(rows[-1]["txid"]), version=rows[-1]["version"])
+        return ChangeFeedPage(
+            changes=changes,
+            next_token=str(next_token),
+            has_more=len(rows) == limit,
+        )
 
-    def _build_ctes(self, activity: str | None) -> str:
-        parts = list(_BASE_CTES)
+    async def stream_all(
+        self,
+        *,
+        bbox: GeoBBox | None = None,
+        activity: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[OrganizationDetail]]:
+        """
+        Отдаёт все карточки пачками через серверный курсор.
+
+        В памяти одновременно держится не больше `batch_size` строк.
+        """
+        where_sql, params = self._build_where(
+            name=None,
+            building=None,
+            phone=None,
+            activity=activity,
+        )
+        if bbox:
+            bbox_sql = (
+                "(b.lat BETWEEN :min_lat AND :max_lat) "
+                "AND (b.lon BETWEEN :min_lon AND :max_lon)"
+            )
+            where_sql = f"{where_sql} AND {bbox_sql}" if where_sql else f"WHERE {bbox_sql}"
+            params.update(bbox.model_dump())
+
+        sql = f"""
+        {self._build_ctes(activity)}
+        {self._build_select(None)}
+        {where_sql}
+        """
+        result = await self.session.stream(
+            text(sql), params, execution_options={"yield_per": batch_size}
+        )
+        async for rows in result.mappings().partitions(batch_size):
+            yield [OrganizationDetail.model_validate(row) for row in rows]
+
+    @staticmethod
+    def _polygon_literal(ring: list[tuple[float, float]]) -> str:
+        points = ",".join(f"({lon!r},{lat!r})" for lon, lat in ring)
+        return f"({points})"
+
+    def _build_select(self, fields: frozenset[str] | None) -> str:
+        aggregates: list[str] = []
+        joins: list[str] = []
+        for field, (column, join) in _AGGREGATE_COLUMNS.items():
+            if fields is None or field in fields:
+                aggregates.append(column)
+                joins.append(join)
+            else:
+                aggregates.append(f"ARRAY[]::text[] AS {field}")
+        return _BASE_SELECT.format(
+            aggregates=",\n    ".join(aggregates),
+            joins="\n".join(joins),
+        )
+
+    def _build_ctes(
+        self,
+        activity: str | None,
+        *,
+        fields: frozenset[str] | None = None,
+        page: str | None = None,
+    ) -> str:
+        """
+        Собирает WITH-блок запроса.
+
+        Агрегаты телефонов и деятельностей добавляются только для запрошенных
+        полей; при заданном `page` они считаются лишь для организаций из CTE page.
+        """
+        parts: list[str] = []
+        scope = ""
+        if page:
+            parts.append(page)
+            scope = "WHERE organization_id IN (SELECT id FROM page)"
+        parts.extend(
+            cte.format(scope=scope)
+            for field, cte in _AGGREGATE_CTES.items()
+            if fields is None or field in fields
+        )
         if activity:
             parts.extend(
                 [
@@ -149,7 +475,9 @@ class OrganizationReadRepository:
                     """,
                 ]
             )
-        return ", ".join(part.strip() for part in parts)
+        if not parts:
+            return ""
+        return "WITH " + ", ".join(part.strip() for part in parts)
 
     def _build_where(
         self,
@@ -158,6 +486,7 @@ class OrganizationReadRepository:
         building: str | None,
         phone: str | None,
         activity: str | None,
+        q: str | None = None,
     ) -> tuple[str, dict[str, object]]:
         conditions: list[str] = []
         params: dict[str, object] = {}
@@ -191,6 +520,9 @@ class OrganizationReadRepository:
                 """
             )
             params["activity"] = f"%{activity}%"
+        if q:
+            conditions.append("o.search_vector @@ websearch_to_tsquery('russian', :q)")
+            params["q"] = q.strip()
 
         if not conditions:
             return "", params
@@ -0,0 +1,199 @@
+import zlib
+from collections.abc import Sequence
+
+import brotli
+import msgpack
+import orjson
+from fastapi import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from application.dto import OrganizationDetail
+
+MEDIA_TYPE_JSON = "application/json"
+MEDIA_TYPE_COLUMNAR_JSON = "application/vnd.catalog.columnar+json"
+MEDIA_TYPE_MSGPACK = "application/msgpack"
+
+_MEDIA_TYPE_ALIASES = {
+    MEDIA_TYPE_JSON: MEDIA_TYPE_JSON,
+    MEDIA_TYPE_COLUMNAR_JSON: MEDIA_TYPE_COLUMNAR_JSON,
+    MEDIA_TYPE_MSGPACK: MEDIA_TYPE_MSGPACK,
+    "application/x-msgpack": MEDIA_TYPE_MSGPACK,
+    "application/*": MEDIA_TYPE_JSON,
+    "*/*": MEDIA_TYPE_JSON,
+}
+
+_COLUMNS = tuple(OrganizationDetail.model_fields)
+
+
+def _parse_quality(params: list[str]) -> float:
+    for param in params:
+        key, _, value = param.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate_media_type(accept: str | None) -> str:
+    """
+    Выбирает формат ответа для списков по заголовку Accept.
+
+    Неизвестные и отсутствующие значения сводятся к обычному JSON.
+    """
+    if not accept:
+        return MEDIA_TYPE_JSON
+
+    best, best_quality = MEDIA_TYPE_JSON, 0.0
+    for item in accept.split(","):
+        media_range, *params = item.split(";")
+        media_type = _MEDIA_TYPE_ALIASES.get(media_range.strip().lower())
+        quality = _parse_quality(params)
+        if media_type and quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def render_organization(
+    item: OrganizationDetail,
+    fields: frozenset[str] | None = None,
+) -> Response:
+    """Сериализует одну карточку в JSON, оставляя только поля `fields`."""
+    include = set(fields) if fields is not None else None
+    return Response(
+        content=orjson.dumps(item.model_dump(include=include)),
+        media_type=MEDIA_TYPE_JSON,
+    )
+
+
+def render_organizations(
+    items: Sequence[OrganizationDetail],
+    media_type: str,
+    fields: frozenset[str] | None = None,
+) -> Response:
+    """
+    Сериализует список карточек в выбранном формате.
+
+    Колоночный формат перечисляет ключи один раз:
+    `{"id": [...], "name": [...], ...}`.
+    """
+    include = set(fields) if fields is not None else None
+    rows = [item.model_dump(include=include) for item in items]
+    if media_type == MEDIA_TYPE_COLUMNAR_JSON:
+        columns = [column for column in _COLUMNS if fields is None or column in fields]
+        body = orjson.dumps({column: [row[column] for row in rows] for column in columns})
+    elif media_type == MEDIA_TYPE_MSGPACK:
+        for row in rows:
+            if "id" in row:
+                row["id"] = str(row["id"])
+        body = msgpack.packb(rows)
+    else:
+        media_type = MEDIA_TYPE_JSON
+        body = orjson.dumps(rows)
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
+
+
+class _Compressor:
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor()
+        else:
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, *, final: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self._brotli.process(data)
+            return chunk + (self._brotli.finish() if final else self._brotli.flush())
+        chunk = self._zlib.compress(data)
+        return chunk + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _select_encoding(accept_encoding: str) -> str | None:
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        accepted[coding.strip().lower()] = _parse_quality(params)
+
+    candidates = [
+        (accepted[coding], coding)
+        for coding in ("br", "gzip")
+        if accepted.get(coding, 0.0) > 0
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda candidate: candidate[0])[1]
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы br/gzip (по Accept-Encoding), если тело не меньше `minimum_size`.
+
+    Потоковые ответы сжимаются по частям.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = _select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: _Compressor | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                assert start_message is not None
+                headers = MutableHeaders(raw=start_message["headers"])
+                if (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith("text/event-stream")
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                body = compressor.compress(body, final=not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                await send(
+                    {"type": "http.response.body", "body": body, "more_body": more_body}
+                )
+                return
+
+            body = compressor.compress(body, final=not more_body)
+            await send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from infra.repository import OrganizationReadRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class StartupState:
+    """Состояние прогрева экземпляра API."""
+
+    started_at: float
+    ready: bool = False
+    warmed_connections: int = 0
+    warmup_seconds: float | None = None
+    startup_seconds: float | None = None
+
+    def render_metrics(self) -> str:
+        """Метрики старта в текстовом формате Prometheus."""
+        lines = [
+            "# TYPE app_ready gauge",
+            f"app_ready {int(self.ready)}",
+            "# TYPE app_warmed_connections gauge",
+            f"app_warmed_connections {self.warmed_connections}",
+        ]
+        if self.startup_seconds is not None:
+            lines += [
+                "# TYPE app_startup_seconds gauge",
+                f"app_startup_seconds {self.startup_seconds:.6f}",
+                "# TYPE app_warmup_seconds gauge",
+                f"app_warmup_seconds {self.warmup_seconds:.6f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+async def _warm_connection(connection: AsyncConnection) -> None:
+    async with AsyncSession(bind=connection) as session:
+        await OrganizationReadRepository(session).warmup()
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> int:
+    """
+    Открывает `connections` соединений пула одновременно и прогоняет на каждом
+    формы запросов репозитория; после этого соединения возвращаются в пул.
+
+    Каждое соединение держится до прогрева всех остальных, чтобы пул открыл
+    их все, а не переиспользовал уже прогретые. Ошибка на одном соединении
+    отменяет остальные. При `connections <= 0` прогрев пропускается.
+    """
+    if connections <= 0:
+        return 0
+    barrier = asyncio.Barrier(connections)
+
+    async def warm_one() -> None:
+        async with engine.connect() as connection:
+            await _warm_connection(connection)
+            await barrier.wait()
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(connections):
+            group.create_task(warm_one())
+    return connections
+
+
+async def run_warmup(
+    state: StartupState,
+    engine: AsyncEngine,
+    *,
+    connections: int,
+    retry_delay: float = 1.0,
+) -> None:
+    """Прогревает пул, повторяя попытки, пока БД недоступна, и отмечает готовность."""
+    warmup_started = time.perf_counter()
+    while True:
+        try:
+            state.warmed_connections = await warm_pool(engine, connections)
+        except* (OSError, SQLAlchemyError):
+            logger.exception("Warmup failed, retrying in %.1fs", retry_delay)
+        else:
+            break
+        await asyncio.sleep(retry_delay)
+
+    finished = time.perf_counter()
+    state.warmup_seconds = finished - warmup_started
+    state.startup_seconds = finished - state.started_at
+    state.ready = True
+    logger.info(
+        "Warmup finished: %d connections in %.3fs, startup %.3fs",
+        state.warmed_connections,
+        state.warmup_seconds,
+        state.startup_seconds,
+    )
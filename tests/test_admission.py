@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from infra.admission import AdmissionController, EndpointClass
+
+
+def make_controller(capacity: int) -> AdmissionController:
+    return AdmissionController(
+        capacity=capacity,
+        classes=[
+            EndpointClass(
+                name="lookup", priority=0, max_in_flight=capacity, max_queue=10, max_wait=5.0
+            ),
+        ],
+    )
+
+
+def test_cancelled_waiter_already_discarded_by_wake() -> None:
+    async def scenario() -> None:
+        controller = make_controller(capacity=2)
+
+        async def hold() -> None:
+            async with controller.admit("lookup"):
+                await asyncio.Event().wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert controller.in_flight == 2
+
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert controller.classes["lookup"].queued == 1
+
+        # Слот освобождается в том же такте, в котором отменяется ожидающий:
+        # _wake выбрасывает его раньше, чем тот сам выйдет из очереди.
+        holders[0].cancel()
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        holders[1].cancel()
+        await asyncio.gather(*holders, return_exceptions=True)
+        assert controller.in_flight == 0
+        assert controller.classes["lookup"].queued == 0
+        assert controller._waiters == []
+
+    asyncio.run(scenario())
+
+
+def test_lower_priority_classes_must_leave_headroom() -> None:
+    with pytest.raises(ValueError):
+        AdmissionController(
+            capacity=2,
+            classes=[
+                EndpointClass(
+                    name="lookup", priority=0, max_in_flight=2, max_queue=10, max_wait=1.0
+                ),
+                EndpointClass(
+                    name="search", priority=1, max_in_flight=1, max_queue=10, max_wait=1.0
+                ),
+                EndpointClass(
+                    name="export", priority=2, max_in_flight=1, max_queue=2, max_wait=5.0
+                ),
+            ],
+        )
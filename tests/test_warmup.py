@@ -0,0 +1,20 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from infra.warmup import StartupState, run_warmup
+
+
+def test_zero_connections_skips_warmup_and_marks_ready() -> None:
+    async def scenario() -> StartupState:
+        engine = create_async_engine("sqlite+aiosqlite://")
+        state = StartupState(started_at=0.0)
+        try:
+            await run_warmup(state, engine, connections=0)
+        finally:
+            await engine.dispose()
+        return state
+
+    state = asyncio.run(scenario())
+    assert state.ready
+    assert state.warmed_connections == 0